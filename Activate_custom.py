@@ -32,6 +32,10 @@ from RepositoryBootstrap import DataTypes                                   # ty
 from RepositoryBootstrap.ActivateActivity import ActivateActivity           # type: ignore  # pylint: disable=import-error,unused-import
 
 
+# ----------------------------------------------------------------------
+_IS_WINDOWS                                 = CurrentShell.family_name == "Windows"
+
+
 # ----------------------------------------------------------------------
 def GetCustomActions(                                                       # pylint: disable=too-many-arguments
     dm: DoneManager,                                                        # pylint: disable=unused-argument
@@ -53,7 +57,7 @@ def GetCustomActions(                                                       # py
 
     assert configuration
 
-    if CurrentShell.family_name == "Windows":
+    if _IS_WINDOWS:
         if "msvc" in configuration:
             commands += [
                 Commands.Set("DEVELOPMENT_ENVIRONMENT_CPP_COMPILER_NAME", "clang-cl"),
@@ -81,9 +85,8 @@ def GetCustomActions(                                                       # py
                 nested_dm,
                 env_name,
                 scripts_dir / subdir,
-                lambda fullpath: (
-                    fullpath.suffix == ".py"
-                    and any(fullpath.stem.endswith(name_suffix) for name_suffix in name_suffixes)
+                lambda fullpath, filename_suffixes=tuple("{}.py".format(name_suffix) for name_suffix in name_suffixes): (
+                    fullpath.name.endswith(filename_suffixes)
                 ),
             )
 
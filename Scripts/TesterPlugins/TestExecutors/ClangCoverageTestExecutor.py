@@ -15,26 +15,33 @@
 # ----------------------------------------------------------------------
 """Contains the ClangCoverageTestExecutor object"""
 
-import json
+import fnmatch
+import functools
+import itertools
 import os
+import re
 
-from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path, PureWindowsPath
+from typing import Any, Callable, Dict, Generator, List, Optional, Set, Tuple
 
-from Common_Foundation.EnumSource import EnumSource
 from Common_Foundation.Streams.DoneManager import DoneManager
-from Common_Foundation import SubprocessEx
 from Common_Foundation.Types import overridemethod
 
 from Common_FoundationEx.CompilerImpl.CompilerImpl import CompilerImpl
 from Common_FoundationEx.TesterPlugins.CodeCoverageValidatorImpl.CodeCoverageFilter import ApplyFilters, CodeCoverageContentFilter, CoverageResult
-from Common_FoundationEx.InflectEx import inflect
 from Common_FoundationEx import TyperEx
 
 from Common_cpp_Development.CodeCoverageExecutor import CodeCoverageExecutor    # type: ignore  # pylint: disable=import-error
 from Common_cpp_Development.TestExecutorImpl import TestExecutorImpl            # type: ignore  # pylint: disable=import-error
 
 
+# ----------------------------------------------------------------------
+# A single part of a '::'-delimited item name
+_ITEM_PART_REGEX                            = r"(?:(?!::).)*"
+
+
 # ----------------------------------------------------------------------
 class TestExecutor(TestExecutorImpl):
     """Test Executor able to process Clang coverage output"""
@@ -95,17 +102,15 @@ class _CodeCoverageExecutor(CodeCoverageExecutor):
 
         with dm.Nested(
             "Removing previous .gcda files...",
-            lambda: "{} found".format(inflect.no("file", found)),
+            lambda: "{} {} found".format(found, "file" if found == 1 else "files"),
         ) as cleanup_dm:
             if coverage_filename.parent.is_dir():
-                for root, _, filenames in EnumSource(coverage_filename.parent):
-                    for filename in filenames:
-                        if os.path.splitext(filename)[1] == ".gcda":
-                            fullpath = root / filename
+                for entry, _ in _EnumGcdaFiles(coverage_filename.parent):
+                    fullpath = Path(entry.path)
 
-                            with cleanup_dm.VerboseNested("'{}'...".format(fullpath)):
-                                fullpath.unlink()
-                                found += 1
+                    with cleanup_dm.VerboseNested("'{}'...".format(fullpath)):
+                        fullpath.unlink()
+                        found += 1
 
     # ----------------------------------------------------------------------
     @overridemethod
@@ -114,40 +119,69 @@ class _CodeCoverageExecutor(CodeCoverageExecutor):
         dm: DoneManager,
         coverage_filename: Path,
     ) -> None:
+        # Imports used when collecting coverage are deferred so that importing this module (which
+        # happens when plugins are registered during activation) remains inexpensive.
+        import shlex                                        # pylint: disable=import-outside-toplevel
+        import subprocess                                   # pylint: disable=import-outside-toplevel
+
         gcda_dirs: Set[Path] = set()
 
         gcda_dirs.add(coverage_filename.parent)
 
         with dm.Nested(
             "Detecting .gcda dirs...",
-            lambda: "{} found".format(inflect.no("directory", len(gcda_dirs))),
+            lambda: "{} {} found".format(len(gcda_dirs), "directory" if len(gcda_dirs) == 1 else "directories"),
         ):
-            for root, _, filenames in EnumSource(coverage_filename.parent):
-                for filename in filenames:
-                    if os.path.splitext(filename)[1] == ".gcda":
-                        gcda_dirs.add(root)
-                        break
+            for _, root in _EnumGcdaFiles(
+                coverage_filename.parent,
+                first_per_directory=True,
+            ):
+                gcda_dirs.add(Path(root))
 
         with dm.Nested("Generating coverage information...") as generate_dm:
-            command_line = 'grcov {dirs} --llvm --output-type ade > "{output_file}"'.format(
-                dirs=" ".join('"{}"'.format(gcda_dir) for gcda_dir in gcda_dirs),
-                output_file=coverage_filename,
+            command_line = ["grcov", ] + [str(gcda_dir) for gcda_dir in gcda_dirs] + ["--llvm", "--output-type", "ade"]
+
+            generate_dm.WriteVerbose(
+                "Command Line: {} > {}\n\n".format(
+                    shlex.join(command_line),
+                    shlex.quote(str(coverage_filename)),
+                ),
             )
 
-            generate_dm.WriteVerbose("Command Line: {}\n\n".format(command_line))
+            # Invoke grcov directly (rather than via a shell) and write its output to the coverage file
+            launch_error: Optional[OSError] = None
+
+            with coverage_filename.open("wb") as f:
+                try:
+                    result = subprocess.run(
+                        command_line,
+                        cwd=coverage_filename.parent,
+                        stdout=f,
+                        stderr=subprocess.PIPE,
+                        encoding="utf-8",
+                        errors="replace",
+                        check=False,
+                    )
+                except OSError as ex:
+                    launch_error = ex
+
+            if launch_error is not None:
+                # grcov couldn't be started (for example, it isn't on the path); don't leave an empty
+                # coverage file behind.
+                coverage_filename.unlink()
+
+                generate_dm.result = -1
+                generate_dm.WriteError("Unable to run '{}': {}\n".format(command_line[0], launch_error))
 
-            result = SubprocessEx.Run(
-                command_line,
-                cwd=coverage_filename.parent,
-            )
+                return
 
             generate_dm.result = result.returncode
 
             if generate_dm.result != 0:
-                generate_dm.WriteError(result.output)
+                generate_dm.WriteError(result.stderr)
 
             with generate_dm.YieldVerboseStream() as stream:
-                stream.write(result.output)
+                stream.write(result.stderr)
 
     # ----------------------------------------------------------------------
     @overridemethod
@@ -163,180 +197,425 @@ class _CodeCoverageExecutor(CodeCoverageExecutor):
     ]:
         with dm.Nested("Extracting coverage information...") as extract_dm:
             # ----------------------------------------------------------------------
-            def CreateItemMatcher(
-                glob_value: str,
-            ) -> Callable[[str], bool]:
-                glob_parts = glob_value.split("::")
+            def ApplyFunc(
+                source_filters: Dict[
+                    str,                    # source filename glob
+                    CodeCoverageContentFilter,
+                ],
+            ) -> Optional[CoverageResult]:
+                # Create the matchers; the filters are frequently the same across binaries, so the
+                # matchers are cached based on the filters' contents.
+                file_matchers, source_file_matchers = _CreateMatchers(
+                    tuple(
+                        (
+                            source_glob,
+                            None if content_filter.includes is None else tuple(content_filter.includes),
+                            None if content_filter.excludes is None else tuple(content_filter.excludes),
+                        )
+                        for source_glob, content_filter in source_filters.items()
+                    ),
+                )
 
-                # ----------------------------------------------------------------------
-                def Impl(
-                    value: str,
-                ) -> bool:
-                    value_parts = value.split("::")
+                # Calculate the results
+                coverage_stat = coverage_filename.stat()
 
-                    glob_part_index = 0
-                    value_part_index = 0
+                coverage_info = _DecodeCoverage(
+                    coverage_filename,
+                    coverage_stat.st_mtime_ns,
+                    coverage_stat.st_size,
+                )
 
-                    while glob_part_index < len(glob_parts) and value_part_index < len(value_parts):
-                        glob_part = glob_parts[glob_part_index]
-                        value_part = value_parts[value_part_index]
+                file_result: Optional[CoverageResult] = None
 
-                        if glob_part == "*{1}":
-                            value_part_index += 1
+                if file_matchers:
+                    for filename, total_covered, total_uncovered in coverage_info.file_totals:
+                        if any(file_matcher(filename) for file_matcher in file_matchers):
+                            file_result = CoverageResult(total_covered, total_uncovered)
+                            break
+
+                has_method_result = False
+                method_covered = 0
+                method_uncovered = 0
+
+                if source_file_matchers:
+                    for filename, method_infos in coverage_info.methods.items():
+                        match_funcs = [
+                            match_func
+                            for file_matcher, match_func in source_file_matchers
+                            if file_matcher(filename)
+                        ]
+
+                        if not match_funcs:
+                            continue
 
-                        elif glob_part == "*":
-                            if glob_part_index + 1 == len(glob_parts):
-                                return True
+                        matches = [
+                            all(match_func(method_name) for match_func in match_funcs)
+                            for method_name in method_infos.names
+                        ]
 
-                            next_glob_part = glob_parts[glob_part_index + 1]
+                        if any(matches):
+                            method_covered += sum(itertools.compress(method_infos.covered, matches))
+                            method_uncovered += sum(itertools.compress(method_infos.uncovered, matches))
+                            has_method_result = True
 
-                            while (
-                                value_part_index < len(value_parts)
-                                and value_parts[value_part_index] != next_glob_part
-                            ):
-                                value_part_index += 1
+                if has_method_result:
+                    return CoverageResult(method_covered, method_uncovered)
+                if file_result is not None:
+                    return file_result
 
-                        else:
-                            if glob_part != value_part:
-                                break
+                return None
 
-                            value_part_index += 1
+            # ----------------------------------------------------------------------
 
-                        glob_part_index += 1
+            source_filenames = compiler_context.get("inputs", None)
+            if source_filenames is None:
+                source_filename = compiler_context.get("input", None)
+                source_filenames = [source_filename, ] if source_filename is not None else []
 
-                    return glob_part_index == len(glob_parts) and value_part_index == len(value_parts)
+            result = ApplyFilters(binary_filename, source_filenames, ApplyFunc)
 
-                # ----------------------------------------------------------------------
+            if result is None:
+                return 0, 0
 
-                return Impl
+            return result.covered, result.uncovered
 
-            # ----------------------------------------------------------------------
-            def CreateSourceMatcher(
-                filter: CodeCoverageContentFilter,
-            ) -> Callable[[str], bool]:
-                include_funcs = [CreateItemMatcher(item) for item in filter.includes or []]
-                exclude_funcs = [CreateItemMatcher(item) for item in filter.excludes or []]
-
-                # ----------------------------------------------------------------------
-                def Impl(
-                    value: str,
-                ) -> bool:
-                    if (
-                        exclude_funcs
-                        and any(exclude_func(value) for exclude_func in exclude_funcs)
-                    ):
-                        return False
-
-                    if (
-                        include_funcs
-                        and not any(include_func(value) for include_func in include_funcs)
-                    ):
-                        return False
-
-                    return True
-
-                # ----------------------------------------------------------------------
-
-                return Impl
 
-            # ----------------------------------------------------------------------
-            def ApplyFunc(
-                source_filters: Dict[
-                    str,                    # source filename glob
-                    CodeCoverageContentFilter,
-                ],
-            ) -> Optional[CoverageResult]:
-                # Create the matchers
-                should_match_all_file_globs: Set[str] = set()
-                source_matchers: Dict[str, Callable[[str], bool]] = {}
+# ----------------------------------------------------------------------
+@dataclass(frozen=True)
+class _MethodInfos(object):
+    """Method coverage information for a file, stored as parallel sequences"""
 
-                for k, v in source_filters.items():
-                    if (
-                        len(v.includes or []) == 1
-                        and v.includes[0] == "*"
-                        and v.excludes is None
-                    ):
-                        should_match_all_file_globs.add(k)
-                        continue
+    # ----------------------------------------------------------------------
+    names: List[str]                        = field(default_factory=list)
+    covered: array                          = field(default_factory=lambda: array("q"))
+    uncovered: array                        = field(default_factory=lambda: array("q"))
 
-                    source_matchers[k] = CreateSourceMatcher(v)
 
-                # Calculate the results
-                file_result: Optional[CoverageResult] = None
-                result: Optional[Tuple[int, int]] = None
-
-                with coverage_filename.open() as f:
-                    for line in f.readlines():
-                        data = json.loads(line)
-
-                        filename = data.get("file", {}).get("name", None)
-                        assert filename is not None
-
-                        filename = Path(filename)
-
-                        # Coverage data is organized by file and by method;
-                        # determine which one we are looking at here.
-                        file_data = data.get("file", {})
-
-                        if "total_covered" in file_data and "total_uncovered" in file_data:
-                            if (
-                                file_result is None
-                                and any(
-                                    filename.match(should_match_all_file_glob)
-                                    for should_match_all_file_glob in should_match_all_file_globs
-                                )
-                            ):
-                                file_result = CoverageResult(
-                                    file_data["total_covered"],
-                                    file_data["total_uncovered"],
-                                )
+# ----------------------------------------------------------------------
+@dataclass(frozen=True)
+class _CoverageInfo(object):
+    """Contents of a coverage file"""
 
-                            continue
+    # ----------------------------------------------------------------------
+    file_totals: List[
+        Tuple[
+            Path,                           # Filename
+            int,                            # Covered
+            int,                            # Not Covered
+        ]
+    ]                                       # In the order in which they appear in the coverage file
 
-                        match_funcs: List[Callable[[str], bool]] = []
+    methods: Dict[
+        Path,                               # Filename
+        _MethodInfos,
+    ]
 
-                        for source_glob, match_func in source_matchers.items():
-                            if filename.match(source_glob):
-                                match_funcs.append(match_func)
 
-                        method_data = data.get("method", None)
-                        assert method_data
+# ----------------------------------------------------------------------
+@functools.lru_cache(maxsize=1)
+def _DecodeCoverage(
+    coverage_filename: Path,
+    mtime_ns: int,                          # pylint: disable=unused-argument
+    size: int,                              # pylint: disable=unused-argument
+) -> _CoverageInfo:
+    """\
+    Parses the coverage file. The same coverage file is used when extracting information for each
+    binary, so the result is cached; `mtime_ns` and `size` are part of the cache key so that changes
+    to the file are detected.
+    """
 
-                        method_name = method_data.get("name", None)
-                        assert method_name is not None
+    try:
+        # orjson is significantly faster than json when parsing large coverage files
+        import orjson as json               # type: ignore  # pylint: disable=import-error,import-outside-toplevel
+    except ImportError:
+        import json                         # pylint: disable=import-outside-toplevel
 
-                        if match_funcs and all(match_func(method_name) for match_func in match_funcs):
-                            total_covered = method_data.get("total_covered", None)
-                            total_uncovered = method_data.get("total_uncovered", None)
+    file_totals: List[Tuple[Path, int, int]] = []
+    methods: Dict[Path, _MethodInfos] = {}
 
-                            assert total_covered is not None
-                            assert total_uncovered is not None
+    # Many records reference the same file, so only create one Path per filename
+    filenames: Dict[str, Path] = {}
 
-                            if result is None:
-                                result = (0, 0)
+    with coverage_filename.open("rb") as f:
+        for line in f:
+            data = json.loads(line)
 
-                            result = (
-                                result[0] + total_covered,
-                                result[1] + total_uncovered,
-                            )
+            file_data = data.get("file", None)
+            assert file_data is not None
 
-                if result is not None:
-                    return CoverageResult(*result)
-                if file_result is not None:
-                    return file_result
+            raw_filename = file_data.get("name", None)
+            assert raw_filename is not None
 
-                return None
+            filename = filenames.get(raw_filename, None)
+            if filename is None:
+                filename = Path(raw_filename)
+                filenames[raw_filename] = filename
 
-            # ----------------------------------------------------------------------
+            # Coverage data is organized by file and by method;
+            # determine which one we are looking at here.
+            if "total_covered" in file_data and "total_uncovered" in file_data:
+                file_totals.append(
+                    (filename, file_data["total_covered"], file_data["total_uncovered"]),
+                )
 
-            source_filenames = compiler_context.get("inputs", None)
-            if source_filenames is None:
-                source_filenames = compiler_context.get("input", None)
-                source_filenames = [source_filenames, ] or []
+                continue
 
-            result = ApplyFilters(binary_filename, source_filenames, ApplyFunc)
+            method_data = data.get("method", None)
+            assert method_data
 
-            if result is None:
-                return 0, 0
+            method_infos = methods.get(filename, None)
+            if method_infos is None:
+                method_infos = _MethodInfos()
+                methods[filename] = method_infos
 
-            return result.covered, result.uncovered
+            method_infos.names.append(method_data["name"])
+            method_infos.covered.append(method_data["total_covered"])
+            method_infos.uncovered.append(method_data["total_uncovered"])
+
+    return _CoverageInfo(file_totals, methods)
+
+
+# ----------------------------------------------------------------------
+def _EnumGcdaFiles(
+    root: Path,
+    *,
+    first_per_directory: bool=False,
+) -> Generator[
+    Tuple[
+        os.DirEntry,
+        str,                                # Containing directory
+    ],
+    None,
+    None,
+]:
+    """\
+    Yields all .gcda files found under the provided root directory; only the first .gcda file within
+    each directory is yielded when `first_per_directory` is True.
+    """
+
+    # `os.scandir` provides the name and type of each entry without additional stat calls
+    directories: List[str] = [str(root), ]
+
+    while directories:
+        directory = directories.pop()
+        check_files = True
+
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            # Match the behavior of `os.walk`, which ignores directories that cannot be opened
+            continue
+
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif check_files and entry.name.endswith(".gcda"):
+                    yield entry, directory
+
+                    # Continue enumerating so that subdirectories are still found
+                    check_files = not first_per_directory
+
+
+# ----------------------------------------------------------------------
+@functools.lru_cache(maxsize=None)
+def _CreateMatchers(
+    source_filters: Tuple[
+        Tuple[
+            str,                                # source filename glob
+            Optional[Tuple[str, ...]],          # includes
+            Optional[Tuple[str, ...]],          # excludes
+        ],
+        ...,
+    ],
+) -> Tuple[
+    List[Callable[[Path], bool]],                   # Filename matchers for files matched in their entirety
+    List[
+        Tuple[
+            Callable[[Path], bool],                 # Filename matcher
+            Callable[[str], Optional[re.Match]],    # Method matcher
+        ]
+    ],
+]:
+    """Creates the matchers used to filter coverage information for the provided source filters"""
+
+    file_matchers: List[Callable[[Path], bool]] = []
+    source_file_matchers: List[Tuple[Callable[[Path], bool], Callable[[str], Optional[re.Match]]]] = []
+
+    for source_glob, includes, excludes in source_filters:
+        if (
+            len(includes or []) == 1
+            and includes[0] == "*"              # type: ignore
+            and excludes is None
+        ):
+            file_matchers.append(_CreateFilenameMatcher(source_glob))
+            continue
+
+        source_file_matchers.append(
+            (
+                _CreateFilenameMatcher(source_glob),
+                # Use the compiled pattern's method directly so that matching doesn't incur the
+                # overhead of an additional Python function call.
+                _CreateSourceRegex(includes or (), excludes or ()).fullmatch,
+            ),
+        )
+
+    return file_matchers, source_file_matchers
+
+
+# ----------------------------------------------------------------------
+@functools.lru_cache(maxsize=None)
+def _CreateFilenameMatcher(
+    glob_value: str,
+) -> Callable[[Path], bool]:
+    """Returns a function equivalent to `Path.match(glob_value)` that uses precompiled patterns"""
+
+    glob_path = Path(glob_value)
+
+    glob_parts = glob_path.parts
+    if not glob_parts:
+        raise ValueError("empty pattern")
+
+    is_case_insensitive = isinstance(glob_path, PureWindowsPath)
+
+    if is_case_insensitive:
+        glob_drive = glob_path.drive.lower()
+        glob_root = glob_path.root.lower()
+    else:
+        glob_drive = glob_path.drive
+        glob_root = glob_path.root
+
+    is_anchored = bool(glob_drive or glob_root)
+
+    if is_anchored:
+        glob_parts = glob_parts[1:]
+
+    # Parts are matched from the end of the filename
+    part_matchers = [
+        re.compile(fnmatch.translate(glob_part), re.IGNORECASE if is_case_insensitive else 0).match
+        for glob_part in reversed(glob_parts)
+    ]
+
+    # ----------------------------------------------------------------------
+    def Impl(
+        filename: Path,
+    ) -> bool:
+        filename_parts = filename.parts
+
+        if is_anchored:
+            if len(filename_parts) != len(part_matchers) + 1:
+                return False
+
+            if is_case_insensitive:
+                filename_drive = filename.drive.lower()
+                filename_root = filename.root.lower()
+            else:
+                filename_drive = filename.drive
+                filename_root = filename.root
+
+            if glob_drive and glob_drive != filename_drive:
+                return False
+            if glob_root and glob_root != filename_root:
+                return False
+
+        elif len(part_matchers) > len(filename_parts):
+            return False
+
+        for part_matcher, filename_part in zip(part_matchers, reversed(filename_parts)):
+            if not part_matcher(filename_part):
+                return False
+
+        return True
+
+    # ----------------------------------------------------------------------
+
+    return Impl
+
+
+# ----------------------------------------------------------------------
+@functools.lru_cache(maxsize=None)
+def _CreateSourceRegex(
+    include_globs: Tuple[str, ...],
+    exclude_globs: Tuple[str, ...],
+) -> re.Pattern:
+    """\
+    Returns a regex that fully matches items that match any of the include globs (or all items if
+    there aren't any include globs) and none of the exclude globs.
+    """
+
+    pattern_parts: List[str] = []
+
+    if exclude_globs:
+        pattern_parts.append(
+            "(?!(?:{})\\Z)".format(
+                "|".join("(?:{})".format(_TranslateItemGlob(glob_value)) for glob_value in exclude_globs),
+            ),
+        )
+
+    if include_globs:
+        pattern_parts.append(
+            "(?:{})".format(
+                "|".join("(?:{})".format(_TranslateItemGlob(glob_value)) for glob_value in include_globs),
+            ),
+        )
+    else:
+        pattern_parts.append(".*")
+
+    return re.compile("".join(pattern_parts), re.DOTALL)
+
+
+# ----------------------------------------------------------------------
+def _TranslateItemGlob(
+    glob_value: str,
+) -> str:
+    """\
+    Translates a glob that matches '::'-delimited item names into a regular expression, where:
+
+        "*{1}": matches exactly one part
+        "*":    matches one or more parts when it is the last part of the glob; otherwise, matches
+                zero or more parts up to the first part that is equal to the next part of the glob
+    """
+
+    glob_parts = glob_value.split("::")
+
+    pattern_parts: List[str] = []
+    add_delimiter = False
+
+    for glob_part_index, glob_part in enumerate(glob_parts):
+        if add_delimiter:
+            pattern_parts.append("::")
+
+        add_delimiter = True
+
+        if glob_part == "*{1}":
+            pattern_parts.append(_ITEM_PART_REGEX)
+
+        elif glob_part == "*":
+            if glob_part_index + 1 == len(glob_parts):
+                pattern_parts.append("{0}(?:::{0})*".format(_ITEM_PART_REGEX))
+            else:
+                # This fragment includes the trailing delimiter for every part that it consumes. The
+                # next glob part is compared literally (even if it is a wildcard), and the fragment
+                # must stop at the first part that is equal to it.
+                next_glob_part = glob_parts[glob_part_index + 1]
+
+                # `str.split("::")` splits on the leftmost delimiter, so a part that ends with ':'
+                # (e.g. "a:" in "a:::b") can only be the last part.
+                next_part_regex = "{}{}".format(
+                    re.escape(next_glob_part),
+                    "\\Z" if next_glob_part.endswith(":") else "(?:::|\\Z)",
+                )
+
+                pattern_parts.append(
+                    "(?:(?!{next}){part}::)*(?={next})".format(
+                        next=next_part_regex,
+                        part=_ITEM_PART_REGEX,
+                    ),
+                )
+
+                add_delimiter = False
+
+        else:
+            pattern_parts.append(re.escape(glob_part))
+
+    return "".join(pattern_parts)
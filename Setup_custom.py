@@ -39,6 +39,10 @@ from RepositoryBootstrap.SetupAndActivate.Installers.Installer import Installer
 from RepositoryBootstrap.SetupAndActivate.Installers.LocalSevenZipInstaller import LocalSevenZipInstaller   # type: ignore  # pylint: disable=import-error,unused-import
 
 
+# ----------------------------------------------------------------------
+_IS_WINDOWS                                 = CurrentShell.family_name == "Windows"
+
+
 # ----------------------------------------------------------------------
 def GetConfigurations() -> Union[
     Configuration.Configuration,
@@ -49,7 +53,7 @@ def GetConfigurations() -> Union[
 ]:
     """Return configuration information for the repository"""
 
-    if CurrentShell.family_name == "Windows":
+    if _IS_WINDOWS:
         architectures = ["x64", ] # TODO: "x86"
     else:
         architectures = [CurrentShell.current_architecture, ]
@@ -59,9 +63,12 @@ def GetConfigurations() -> Union[
     for llvm_version in [
         "15.0.2",
     ]:
-        for architecture in architectures:
-            if CurrentShell.family_name == "Windows":
-                configurations["{}-mingw-{}".format(llvm_version, architecture)] = Configuration.Configuration(
+        if _IS_WINDOWS:
+            for architecture in architectures:
+                # The configuration names are also the names of the corresponding Common_LLVM configurations
+                configuration_name = "{}-mingw-{}".format(llvm_version, architecture)
+
+                configurations[configuration_name] = Configuration.Configuration(
                     "Uses Clang and LLVM 'v{}' (with mingw) targeting '{}'.".format(
                         llvm_version,
                         architecture,
@@ -70,7 +77,7 @@ def GetConfigurations() -> Union[
                         Configuration.Dependency(
                             uuid.UUID("6b2e7017-3364-4722-941f-199ade541e41"),
                             "Common_LLVM",
-                            "{}-mingw-{}".format(llvm_version, architecture),
+                            configuration_name,
                             "https://github.com/davidbrownell/v4-Common_LLVM.git",
                         ),
                         Configuration.Dependency(
@@ -85,7 +92,9 @@ def GetConfigurations() -> Union[
                 for msvc_version in [
                     "17.4",
                 ]:
-                    configurations["{}-msvc-{}-{}".format(llvm_version, msvc_version, architecture)] = Configuration.Configuration(
+                    configuration_name = "{}-msvc-{}-{}".format(llvm_version, msvc_version, architecture)
+
+                    configurations[configuration_name] = Configuration.Configuration(
                         "Uses Clang and LLVM 'v{}' (with Microsoft Visual Studio 'v{}') targeting '{}'.".format(
                             llvm_version,
                             msvc_version,
@@ -95,7 +104,7 @@ def GetConfigurations() -> Union[
                             Configuration.Dependency(
                                 uuid.UUID("6b2e7017-3364-4722-941f-199ade541e41"),
                                 "Common_LLVM",
-                                "{}-msvc-{}-{}".format(llvm_version, msvc_version, architecture),
+                                configuration_name,
                                 "https://github.com/davidbrownell/v4-Common_LLVM.git",
                             ),
                             Configuration.Dependency(
@@ -107,14 +116,17 @@ def GetConfigurations() -> Union[
                         ],
                     )
 
-            else:
-                configurations["{}-{}".format(llvm_version, architecture)] = Configuration.Configuration(
+        else:
+            for architecture in architectures:
+                configuration_name = "{}-{}".format(llvm_version, architecture)
+
+                configurations[configuration_name] = Configuration.Configuration(
                     "Uses Clang and and LLVM 'v{}' (without any external dependencies) targeting '{}'.".format(llvm_version, architecture),
                     [
                         Configuration.Dependency(
                             uuid.UUID("6b2e7017-3364-4722-941f-199ade541e41"),
                             "Common_LLVM",
-                            "{}-{}".format(llvm_version, architecture),
+                            configuration_name,
                             "https://github.com/davidbrownell/v4-Common_LLVM.git",
                         ),
                         Configuration.Dependency(